@@ -7,9 +7,13 @@ from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 from pathlib import Path
 
+import joblib
+import numpy as np
+from scipy import sparse
+
 # simple vectorizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.pipeline import Pipeline
+from tfidf_index import INDEX_DIR, INDEX_FORMAT, make_vectorizer  # INDEX_DIR written by scripts/build_index.py
 
 DATA_PATH = Path("data/materials.json")
 
@@ -52,21 +56,55 @@ def load_data() -> list[dict]:
         raise RuntimeError(f"{DATA_PATH} not found. Run the scraper first.")
     return json.load(open(DATA_PATH, "r", encoding="utf-8"))
 
+def load_index(texts: list[str]):
+    """Load the persisted vectorizer + CSR matrix, or refit if missing/stale."""
+    vec_path = INDEX_DIR / "vectorizer.joblib"
+    if vec_path.exists() and vec_path.stat().st_mtime >= DATA_PATH.stat().st_mtime:
+        saved = joblib.load(vec_path)
+        # indexes from an older build_index.py (e.g. a bare TfidfVectorizer) are refit
+        if saved.get("format") == INDEX_FORMAT and isinstance(saved.get("vectorizer"), Pipeline):
+            # memory-mapped, read-only: preloaded workers share these pages
+            arrays = [np.load(INDEX_DIR / f"{n}.npy", mmap_mode="r") for n in ("data", "indices", "indptr")]
+            matrix = sparse.csr_matrix(tuple(arrays), shape=saved["shape"], copy=False).astype(np.float32, copy=False)
+            if matrix.shape[0] == len(texts):
+                return saved["vectorizer"], matrix
+    print(f"[warn] {INDEX_DIR} missing or stale, refitting (run scripts/build_index.py to persist)")
+    vectorizer = make_vectorizer()
+    return vectorizer, vectorizer.fit_transform(texts)
+
 app = FastAPI(title="Donizo Materials Vector API (TF-IDF demo)")
 
 DATA = load_data()
 TEXTS = [build_text(r) for r in DATA]
-VECTORIZER = TfidfVectorizer(min_df=2, ngram_range=(1,2))
-MATRIX = VECTORIZER.fit_transform(TEXTS)
+VECTORIZER, MATRIX = load_index(TEXTS)
+# rows and queries come out L2-normalized, so cosine similarity is a plain dot product
+if VECTORIZER[-1].norm != "l2":
+    raise RuntimeError("search() assumes L2-normalized TF-IDF rows (norm='l2')")
+
+def encode_labels(values: list[str]) -> tuple[dict[str, int], np.ndarray]:
+    """Map lowercased labels to small int codes (LabelEncoder-style)."""
+    codes: dict[str, int] = {}
+    arr = np.fromiter((codes.setdefault(v.lower(), len(codes)) for v in values), dtype=np.int16, count=len(values))
+    return codes, arr
+
+# category/site as int code arrays, built once so request filters run as numpy masks
+CAT_CODE, CAT_CODES = encode_labels([r["category"] for r in DATA])
+SITE_CODE, SITE_CODES = encode_labels([r["site"] for r in DATA])
+
+def filter_idxs(site: Optional[str] = None, category: Optional[str] = None) -> np.ndarray:
+    mask = np.ones(len(DATA), dtype=bool)
+    if site:
+        mask &= SITE_CODES == SITE_CODE.get(site.lower(), -1)
+    if category:
+        mask &= CAT_CODES == CAT_CODE.get(category.lower(), -1)
+    return np.flatnonzero(mask)
 
 @app.get("/materials/{category}", response_model=List[MaterialItem])
 def get_by_category(category: str, site: Optional[str] = None, limit: int = 100):
-    rows = [r for r in DATA if r["category"].lower() == category.lower()]
-    if site:
-        rows = [r for r in rows if r["site"].lower() == site.lower()]
+    rows = [DATA[i] for i in filter_idxs(site=site, category=category)[:limit]]
     if not rows:
         raise HTTPException(status_code=404, detail="No data for given filters")
-    return rows[:limit]
+    return rows
 
 @app.get("/search")
 def search(
@@ -76,17 +114,20 @@ def search(
     top_k: int = 20
 ):
     # optional filters first
-    idxs = list(range(len(DATA)))
-    if site:
-        idxs = [i for i in idxs if DATA[i]["site"].lower() == site.lower()]
-    if category:
-        idxs = [i for i in idxs if DATA[i]["category"].lower() == category.lower()]
-    if not idxs:
+    idxs = filter_idxs(site=site, category=category)
+    if idxs.size == 0:
         raise HTTPException(status_code=404, detail="No data after filters")
 
-    q_vec = VECTORIZER.transform([q])
-    sims = cosine_similarity(q_vec, MATRIX[idxs]).ravel()
-    order = sims.argsort()[::-1][:top_k]
+    q_vec = VECTORIZER.transform([q]).astype(np.float32, copy=False)
+    # no filters: score the whole matrix instead of fancy-indexing a copy of it
+    sub = MATRIX if len(idxs) == MATRIX.shape[0] else MATRIX[idxs]
+    sims = sub.dot(q_vec.T).toarray().ravel()
+    # partial selection of the top k, then sort only those k
+    k = min(top_k, sims.size)
+    if k <= 0:
+        return []
+    part = np.argpartition(sims, -k)[-k:]
+    order = part[np.argsort(-sims[part], kind="stable")]
     out = []
     for j in order:
         i = idxs[j]
@@ -6,24 +6,34 @@ Donizo - Material Price Scraper
 """
 
 import argparse
+import asyncio
+import atexit
 import dataclasses
 import hashlib
-import json
+import itertools
 import os
-import random
 import re
+import sqlite3
+import threading
 import time
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
-from typing import Iterable, List, Optional, Tuple
+from typing import Any, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin, urlencode, urlparse, parse_qs, urlunparse
 
+import orjson
 import requests
+import soupsieve as sv
 import yaml
 from bs4 import BeautifulSoup, Tag
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:  # optional fast parser; BeautifulSoup is used when it is missing
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
 # ---------------- Models ----------------
 @dataclasses.dataclass
 class Price:
@@ -53,9 +63,19 @@ USER_AGENTS = [
     "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1",
 ]
 
-PRICE_REGEX = re.compile(
-    r"(?P<currency>€|EUR|£)\s*(?P<amount>\d+[.,]?\d*(?:[.,]\d{2})?)|(?P<amount2>\d+[.,]?\d*)\s*(?P<currency2>€|EUR|£)",
-    re.I,
+# rotated per request (see UserAgentAdapter) so one pooled session can keep its
+# keep-alive connections instead of being rebuilt to change UA
+_UA_CYCLE = itertools.cycle(USER_AGENTS)
+
+def next_user_agent() -> str:
+    return next(_UA_CYCLE)
+
+# currency + amount, then an optional "/ unit" or "par unit" later in the same string,
+# so one search usually yields all three (UNIT_REGEX covers a unit before the price)
+PRICE_UNIT_REGEX = re.compile(
+    r"(?:(?P<currency>€|EUR|£)\s*(?P<amount>\d+[.,]?\d*(?:[.,]\d{2})?)|(?P<amount2>\d+[.,]?\d*)\s*(?P<currency2>€|EUR|£))"
+    r"(?:.*?(?:/|par)\s*(?P<unit>m2|m²|m3|L|l|kg|pièce|unité|paquet|boîte|m|ml)\b)?",
+    re.I | re.S,
 )
 UNIT_REGEX = re.compile(r"(?:/|par)\s*(m2|m²|m3|L|l|kg|pièce|unité|paquet|boîte|m|ml)\b", re.I)
 
@@ -66,25 +86,106 @@ def parse_price_unit(text: Optional[str]) -> Tuple[Optional[float], Optional[str
     if not text:
         return None, None, None, None
     t = text.replace("\xa0", " ").strip()
-    m = PRICE_REGEX.search(t)
-    currency = (m.group("currency") or m.group("currency2") or "").strip() if m else None
-    amount = (m.group("amount") or m.group("amount2") or "").replace(" ", "").replace(",", ".") if m else None
+    m = PRICE_UNIT_REGEX.search(t)
+    if not m:
+        mu = UNIT_REGEX.search(t)
+        return None, None, (mu.group(1) if mu else None), t
+    currency = (m.group("currency") or m.group("currency2") or "").strip()
+    amount = (m.group("amount") or m.group("amount2") or "").replace(" ", "").replace(",", ".")
     val = None
     if amount:
         try:
             val = float(amount)
         except ValueError:
             val = None
-    if currency and currency.upper().startswith("E"):
+    if currency.upper().startswith("E"):
         currency = "€"
-    unit = None
-    mu = UNIT_REGEX.search(t)
-    if mu:
-        unit = mu.group(1)
+    unit = m.group("unit")
+    if unit is None:
+        # no unit after the price (the common case): only the text before it can still
+        # hold one, e.g. "/m² 12,50 €"
+        mu = UNIT_REGEX.search(t, 0, m.start())
+        unit = mu.group(1) if mu else None
     return val, currency, unit, t
 
-def text_or_none(node: Optional[Tag]) -> Optional[str]:
-    return node.get_text(strip=True) if node else None
+# ---------------- Node helpers (BeautifulSoup Tag or selectolax LexborNode) ----------------
+Node = Any
+
+def text_or_none(node: Optional[Node]) -> Optional[str]:
+    if node is None:
+        return None
+    return node.get_text(strip=True) if isinstance(node, Tag) else node.text(strip=True)
+
+def node_name(node: Node) -> str:
+    return node.name if isinstance(node, Tag) else node.tag
+
+def node_attr(node: Node, key: str) -> Optional[str]:
+    return node.get(key) if isinstance(node, Tag) else node.attributes.get(key)
+
+def find_parent(node: Node, names: Iterable[str]) -> Optional[Node]:
+    if isinstance(node, Tag):
+        return node.find_parent(list(names))
+    parent = node.parent
+    while parent is not None and parent.tag not in names:
+        parent = parent.parent
+    return parent
+
+def stripped_strings(node: Node) -> Iterable[str]:
+    if isinstance(node, Tag):
+        return node.stripped_strings
+    return [t for t in node.text(separator="\n", strip=True).split("\n") if t]
+
+def _has_brotli() -> bool:
+    try:
+        import brotli  # noqa
+        return True
+    except ImportError:
+        try:
+            import brotlicffi  # noqa
+            return True
+        except ImportError:
+            return False
+
+BROWSER_HEADERS = {
+    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.7",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    # only advertise br when urllib3/httpx can decode it
+    "Accept-Encoding": "br, gzip, deflate" if _has_brotli() else "gzip, deflate",
+}
+CHARSET_REGEX = re.compile(r"charset=[\"']?([\w-]+)", re.I)
+META_CHARSET_REGEX = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.I)
+
+def response_charset(r) -> Optional[str]:
+    m = CHARSET_REGEX.search(r.headers.get("Content-Type", ""))
+    return m.group(1).lower() if m else None
+
+def response_text(r) -> str:
+    """Decoded page: header charset, else the page's <meta charset>, else UTF-8.
+    (requests' own r.text would fall back to ISO-8859-1 for undeclared text/html.)"""
+    charset = response_charset(r)
+    if charset is None:
+        mm = META_CHARSET_REGEX.search(r.content[:4096])
+        charset = mm.group(1).decode("ascii") if mm else "utf-8"
+    try:
+        return r.content.decode(charset, errors="replace")
+    except LookupError:
+        return r.content.decode("utf-8", errors="replace")
+
+def response_body(r, fast: bool) -> "str | bytes":
+    """Raw bytes when the header declares UTF-8 (skipping requests' text decoding and
+    charset sniffing), or for BeautifulSoup when it declares nothing, since bs4 honours
+    <meta charset>. lexbor decodes any bytes as UTF-8, so everything else is decoded here."""
+    charset = response_charset(r)
+    if charset in ("utf-8", "utf8") or (charset is None and not fast):
+        return r.content
+    return response_text(r)
+
+class UserAgentAdapter(HTTPAdapter):
+    """HTTPAdapter that stamps the next rotated User-Agent on every outgoing request."""
+
+    def send(self, request, *args, **kwargs):
+        request.headers["User-Agent"] = next_user_agent()
+        return super().send(request, *args, **kwargs)
 
 def make_session() -> requests.Session:
     s = requests.Session()
@@ -93,17 +194,77 @@ def make_session() -> requests.Session:
         status_forcelist=[403, 429, 500, 502, 503, 504],
         allowed_methods=["GET", "HEAD"]
     )
-    adapter = HTTPAdapter(max_retries=retries, pool_maxsize=10)
+    # sized for run_scrape's worker threads sharing this session
+    adapter = UserAgentAdapter(max_retries=retries, pool_connections=32, pool_maxsize=32)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     s.headers.update({
-        "User-Agent": random.choice(USER_AGENTS),
-        "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.7",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        **BROWSER_HEADERS,
         "Connection": "keep-alive",
     })
     return s
 
+def _rotate_user_agent(request):
+    # httpx request hook, same rotation as UserAgentAdapter
+    request.headers["User-Agent"] = next_user_agent()
+
+def make_http2_client():
+    """httpx client multiplexing requests over one HTTP/2 connection per host.
+
+    Drop-in for make_session(): same .get(url, timeout=...) and response API,
+    and safe to share across run_scrape's worker threads.
+    """
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("httpx not installed. Run: pip install 'httpx[http2]'")
+    # limits/http2 must go on the transport: Client ignores them when a transport is given
+    transport = httpx.HTTPTransport(
+        http2=True, retries=3,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    )
+    return httpx.Client(
+        transport=transport,
+        follow_redirects=True,
+        headers=BROWSER_HEADERS,
+        event_hooks={"request": [_rotate_user_agent]},
+    )
+
+class HttpCache:
+    """On-disk (sqlite) cache of fetched pages with their ETag/Last-Modified.
+
+    Lets re-runs send conditional GETs and reuse the stored body on a 304;
+    entries younger than ttl seconds are served without any request.
+    """
+
+    def __init__(self, path: str, ttl: float = 0):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT, ts REAL)"
+        )
+
+    def get(self, url: str) -> Optional[tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, last_modified, body, ts FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+
+    def touch(self, url: str):
+        with self._lock, self._db:
+            self._db.execute("UPDATE pages SET ts = ? WHERE url = ?", (time.time(), url))
+
 def paginate(url: str, param: str, start: int, max_pages: int) -> Iterable[str]:
     parsed = urlparse(url)
     q = parse_qs(parsed.query)
@@ -120,66 +281,197 @@ def _has_playwright() -> bool:
     except Exception:
         return False
 
-@contextmanager
-def playwright_page(user_agent: Optional[str] = None, locale: str = "fr-FR"):
-    from playwright.sync_api import sync_playwright
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        ctx = browser.new_context(
-            user_agent=user_agent or random.choice(USER_AGENTS),
-            locale=locale, viewport={"width": 1366, "height": 900}
+PLAYWRIGHT_MAX_CONCURRENCY = 4
+
+class PlaywrightPool:
+    """One headless Chromium for the whole process; every URL gets its own context.
+
+    The browser lives on a private event loop in a daemon thread, so sync
+    callers (from any thread) just submit batches of URLs to it.
+    """
+
+    def __init__(self, max_concurrency: int = PLAYWRIGHT_MAX_CONCURRENCY, locale: str = "fr-FR"):
+        self.max_concurrency = max_concurrency
+        self.locale = locale
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._pw = None
+        self._browser = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="playwright-pool", daemon=True).start()
+            return self._loop
+
+    async def _start(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+                self._pw = await async_playwright().start()
+                try:
+                    self._browser = await self._pw.chromium.launch(headless=True)
+                except Exception:
+                    # don't leave the driver process running (e.g. Chromium not installed)
+                    await self._pw.stop()
+                    self._pw = None
+                    raise
+                self._sem = asyncio.Semaphore(self.max_concurrency)
+
+    async def _fetch_one(self, url: str, wait_selector: Optional[str], delay_ms: int) -> str:
+        async with self._sem:
+            ctx = await self._browser.new_context(
+                user_agent=next_user_agent(),
+                locale=self.locale, viewport={"width": 1366, "height": 900}
+            )
+            try:
+                page = await ctx.new_page()
+                await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                if wait_selector:
+                    try:
+                        await page.wait_for_selector(wait_selector, timeout=15000)
+                    except Exception:
+                        pass
+                await page.wait_for_timeout(delay_ms)
+                return await page.content()
+            finally:
+                await ctx.close()
+
+    async def _fetch_all(self, urls: List[str], wait_selector: Optional[str], delay_ms: int) -> list:
+        await self._start()
+        return await asyncio.gather(
+            *(self._fetch_one(u, wait_selector, delay_ms) for u in urls), return_exceptions=True
         )
-        page = ctx.new_page()
-        try:
-            yield page
-        finally:
-            ctx.close(); browser.close()
+
+    def fetch(self, urls: List[str], wait_selector: Optional[str] = None, delay_ms: int = 800) -> list:
+        """Render urls concurrently; returns HTML strings, or the exception for failed URLs, in order."""
+        fut = asyncio.run_coroutine_threadsafe(self._fetch_all(urls, wait_selector, delay_ms), self._ensure_loop())
+        return fut.result()
+
+    async def _stop(self):
+        if self._browser is not None:
+            await self._browser.close()
+            await self._pw.stop()
+            self._browser = self._pw = None
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+_PLAYWRIGHT_POOL: Optional[PlaywrightPool] = None
+_PLAYWRIGHT_POOL_LOCK = threading.Lock()
+
+def playwright_pool() -> PlaywrightPool:
+    global _PLAYWRIGHT_POOL
+    with _PLAYWRIGHT_POOL_LOCK:
+        if _PLAYWRIGHT_POOL is None:
+            if not _has_playwright():
+                raise RuntimeError("Playwright not installed. Run: python -m playwright install chromium")
+            _PLAYWRIGHT_POOL = PlaywrightPool()
+            atexit.register(_PLAYWRIGHT_POOL.close)
+        return _PLAYWRIGHT_POOL
 
 def fetch_with_playwright(url: str, wait_selector: Optional[str] = None, delay_ms: int = 800) -> str:
-    if not _has_playwright():
-        raise RuntimeError("Playwright not installed. Run: python -m playwright install chromium")
-    with playwright_page() as page:
-        page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        if wait_selector:
-            try:
-                page.wait_for_selector(wait_selector, timeout=15000)
-            except Exception:
-                pass
-        page.wait_for_timeout(delay_ms)
-        return page.content()
+    html = playwright_pool().fetch([url], wait_selector=wait_selector, delay_ms=delay_ms)[0]
+    if isinstance(html, Exception):
+        raise html
+    return html
 
 # ---------------- Core scraper ----------------
 class SiteScraper:
-    def __init__(self, site_key: str, site_cfg: dict, session: requests.Session):
+    def __init__(self, site_key: str, site_cfg: dict, session: requests.Session, cache: Optional[HttpCache] = None):
         self.site_key = site_key
         self.cfg = site_cfg
         self.S = site_cfg["selectors"]
+        # compile each CSS selector once instead of re-parsing it on every card
+        # (bs4 path only: with parser: fast, lexbor takes the selector strings)
+        self.sel = {k: sv.compile(v) for k, v in self.S.items() if isinstance(v, str) and v}
         self.pag = site_cfg.get("pagination", {})
         self.throttle = float(site_cfg.get("throttle_seconds", 0.5))
         self.session = session
+        self.cache = cache
+        # bounds in-flight requests to this site when categories are scraped in parallel
+        self.slots = threading.Semaphore(int(site_cfg.get("max_in_flight", 2)))
         self.use_playwright = site_cfg.get("driver", "").lower() == "playwright"
-
-    def _fetch_html(self, url: str) -> str:
-        time.sleep(self.throttle)
-        r = self.session.get(url, timeout=30)
-        if r.status_code == 200 and r.text.strip():
-            return r.text
-        if self.use_playwright or r.status_code in (403, 429):
+        # parser: fast (selectolax/lexbor) | bs4 (BeautifulSoup + lxml, for BS4-specific selectors)
+        self.fast = site_cfg.get("parser", "fast").lower() == "fast" and LexborHTMLParser is not None
+        # (category, product url) already parsed; repeat cards across pages are skipped early
+        self._seen_urls: set[tuple[str, str]] = set()
+
+    def _fetch_html(self, url: str, render_fallback: bool = True) -> "str | bytes":
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            etag, last_modified, body, ts = cached
+            if time.time() - ts < self.cache.ttl:
+                return body
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        with self.slots:
+            time.sleep(self.throttle)
+            r = self.session.get(url, timeout=30, headers=headers)
+        if r.status_code == 304 and cached:
+            self.cache.touch(url)
+            return cached[2]
+        body = response_body(r, self.fast)
+        if r.status_code == 200 and body.strip():
+            etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+            # without a validator (or a ttl) the row could never be served again
+            if self.cache and (etag or last_modified or self.cache.ttl > 0):
+                # stored decoded, so it is safe for either parser on later runs
+                self.cache.put(url, etag, last_modified, body if isinstance(body, str) else response_text(r))
+            return body
+        if render_fallback and (self.use_playwright or r.status_code in (403, 429)):
             try:
                 return fetch_with_playwright(url, wait_selector=self.S.get("product_card"))
             except Exception as e:
                 print(f"[warn] Playwright failed on {url}: {e}")
         r.raise_for_status()
-        return r.text
+        return body
 
-    def fetch(self, url: str) -> BeautifulSoup:
-        return BeautifulSoup(self._fetch_html(url), "lxml")
+    def parse(self, html: "str | bytes") -> Node:
+        return LexborHTMLParser(html) if self.fast else BeautifulSoup(html, "lxml")
 
-    def iterate_pages(self, start_url: str) -> Iterable[tuple[str, BeautifulSoup]]:
+    def fetch(self, url: str, render_fallback: bool = True) -> Node:
+        return self.parse(self._fetch_html(url, render_fallback))
+
+    def render_pages(self, urls: List[str]) -> Iterable[tuple[str, Node]]:
+        # playwright sites: render pages a batch at a time on the shared browser
+        pool = playwright_pool()
+        for b in range(0, len(urls), pool.max_concurrency):
+            batch = urls[b:b + pool.max_concurrency]
+            time.sleep(self.throttle)
+            try:
+                results = pool.fetch(batch, wait_selector=self.S.get("product_card"))
+            except Exception as e:
+                results = [e] * len(batch)
+            for url, html in zip(batch, results):
+                if isinstance(html, Exception):
+                    print(f"[warn] Playwright failed on {url}: {html}; falling back to requests")
+                    try:
+                        yield url, self.fetch(url, render_fallback=False)
+                    except Exception as e:
+                        print(f"[warn] fetch failed: {e}")
+                    continue
+                yield url, self.parse(html)
+
+    def iterate_pages(self, start_url: str) -> Iterable[tuple[str, Node]]:
         param = self.pag.get("param")
         start_page = int(self.pag.get("start_page", 1))
         max_pages = int(self.pag.get("max_pages", 10))
-        if param:
+        if param and self.use_playwright and _has_playwright():
+            yield from self.render_pages(list(paginate(start_url, param, start_page, max_pages)))
+        elif param:
             for url in paginate(start_url, param, start_page, max_pages):
                 try:
                     yield url, self.fetch(url)
@@ -191,52 +483,73 @@ class SiteScraper:
             except Exception as e:
                 print(f"[warn] fetch failed: {e}")
 
-    def parse_card(self, base_url: str, card: Tag, category: str) -> Optional[MaterialItem]:
+    def select_one(self, key: str, node: Node) -> Optional[Node]:
+        if isinstance(node, Tag):
+            sel = self.sel.get(key)
+            return sel.select_one(node) if sel else None
+        sel = self.S.get(key)
+        if not sel:
+            return None
+        # lexbor matches the node itself too; soupsieve only searches descendants
+        first = node.css_first(sel)
+        if first is None or first != node:
+            return first
+        return next((n for n in node.css(sel) if n != node), None)
+
+    def select(self, key: str, doc: Node) -> List[Node]:
+        if isinstance(doc, Tag):
+            return self.sel[key].select(doc)
+        return doc.css(self.S[key])
+
+    def parse_card(self, base_url: str, card: Node, category: str, scraped_at: Optional[str] = None) -> Optional[MaterialItem]:
         container = card
-        if card.name == "a":
-            container = card.find_parent(["li", "article", "div"]) or card
-            href = card.get("href")
+        if node_name(card) == "a":
+            container = find_parent(card, ("li", "article", "div")) or card
+            href = node_attr(card, "href")
         else:
-            url_node = container.select_one(self.S.get("url")) if self.S.get("url") else None
-            href = url_node.get("href") if url_node else None
+            url_node = self.select_one("url", container)
+            href = node_attr(url_node, "href") if url_node is not None else None
         full_url = urljoin(base_url, href) if href else base_url
+        seen_key = (category, full_url) if href else None
+        if seen_key in self._seen_urls:
+            return None
 
-        name_node = container.select_one(self.S.get("name")) if self.S.get("name") else None
-        name = (text_or_none(name_node) if name_node else None) or (text_or_none(card) if card.name == "a" else None)
+        name_node = self.select_one("name", container)
+        name = text_or_none(name_node) or (text_or_none(card) if node_name(card) == "a" else None)
         if not name:
             return None
+        # only mark the URL once the card yields an item: a tile's image-only link
+        # shares its href with the title link that comes after it
+        if seen_key:
+            self._seen_urls.add(seen_key)
 
         brand = None
-        if self.S.get("brand"):
-            b = container.select_one(self.S["brand"])
-            if b:
-                brand = text_or_none(b) or None
+        b = self.select_one("brand", container)
+        if b is not None:
+            brand = text_or_none(b) or None
 
         price_text = None
-        if self.S.get("price"):
-            p = container.select_one(self.S["price"])
-            if p:
-                price_text = text_or_none(p)
+        p = self.select_one("price", container)
+        if p is not None:
+            price_text = text_or_none(p)
         if not price_text:
-            for t in container.stripped_strings:
+            for t in stripped_strings(container):
                 if "€" in t:
                     price_text = t; break
 
         val, cur, unit, raw = parse_price_unit(price_text)
 
         img_url = None
-        if self.S.get("image"):
-            img = container.select_one(self.S["image"])
-            if img:
-                src = img.get("src") or img.get("data-src")
-                if src:
-                    img_url = urljoin(base_url, src)
+        img = self.select_one("image", container)
+        if img is not None:
+            src = node_attr(img, "src") or node_attr(img, "data-src")
+            if src:
+                img_url = urljoin(base_url, src)
 
         availability = None
-        if self.S.get("availability"):
-            a = container.select_one(self.S["availability"])
-            if a:
-                availability = text_or_none(a) or None
+        a = self.select_one("availability", container)
+        if a is not None:
+            availability = text_or_none(a) or None
 
         return MaterialItem(
             id=stable_id(self.site_key, category, name, full_url),
@@ -249,26 +562,39 @@ class SiteScraper:
             url=full_url,
             image_url=img_url,
             availability=availability,
-            scraped_at=datetime.now(timezone.utc).isoformat(),
+            scraped_at=scraped_at or datetime.now(timezone.utc).isoformat(),
         )
 
     def scrape_category(self, category_key: str, cat_cfg: dict, limit: int) -> List[MaterialItem]:
         items: List[MaterialItem] = []
         start_url = cat_cfg["url"]
-        for page_url, soup in self.iterate_pages(start_url):
-            cards = soup.select(self.S["product_card"])
-            if not cards and page_url == start_url:
+        # listings past the last page come back empty (or repeat earlier cards): stop
+        # after this many pages in a row without a new card instead of running to max_pages
+        stop_after_empty = int(self.pag.get("stop_after_empty", 1))
+        empty_run = 0
+        for page_no, (page_url, soup) in enumerate(self.iterate_pages(start_url)):
+            cards = self.select("product_card", soup)
+            if not cards and page_no == 0:
+                # first page empty: retry the unpaged base URL
                 try:
                     soup = self.fetch(start_url)
-                    cards = soup.select(self.S["product_card"])
+                    cards = self.select("product_card", soup)
                 except Exception:
                     pass
+            # one timestamp per fetched page rather than per card
+            now_iso = datetime.now(timezone.utc).isoformat()
+            new_cards = 0
             for card in cards:
-                it = self.parse_card(page_url, card, category_key)
+                it = self.parse_card(page_url, card, category_key, now_iso)
+                if it:
+                    new_cards += 1
                 if it and it.price.value is not None:
                     items.append(it)
                     if len(items) >= limit:
                         return items
+            empty_run = 0 if new_cards else empty_run + 1
+            if stop_after_empty and empty_run >= stop_after_empty:
+                break
         return items
 
 # ---------------- Runner ----------------
@@ -276,42 +602,32 @@ def load_config(path: str) -> dict:
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
-def to_serializable(items: List[MaterialItem]) -> List[dict]:
-    return [
-        {
-            "id": i.id,
-            "site": i.site,
-            "category": i.category,
-            "name": i.name,
-            "brand": i.brand,
-            "price": {"value": i.price.value, "currency": i.price.currency, "raw": i.price.raw},
-            "unit": i.unit,
-            "url": i.url,
-            "image_url": i.image_url,
-            "availability": i.availability,
-            "scraped_at": i.scraped_at,
-        }
-        for i in items
-    ]
-
 def run_scrape(args) -> List[MaterialItem]:
     cfg = load_config(args.config)
-    session = make_session()
+    session = make_http2_client() if args.http2 else make_session()
+    cache = HttpCache(args.http_cache, ttl=args.cache_ttl) if args.http_cache else None
     all_items: List[MaterialItem] = []
 
     sites = cfg["sites"]
     target_sites = list(sites.keys()) if args.site == "all" else [args.site]
     categories_filter = set([c.strip() for c in args.categories.split(",") if c.strip()]) if args.categories else None
 
-    for site_key in target_sites:
-        site_cfg = sites[site_key]
-        scraper = SiteScraper(site_key, site_cfg, session=session)
-        for cat_key, cat_cfg in site_cfg["categories"].items():
-            if categories_filter and cat_key not in categories_filter:
-                continue
-            got = scraper.scrape_category(cat_key, cat_cfg, limit=args.limit_per_category)
-            all_items.extend(got)
-            print(f"[info] {site_key}/{cat_key}: {len(got)} items")
+    # categories are I/O bound: fan them out, keep results in config order
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        futures = {}
+        for site_key in target_sites:
+            site_cfg = sites[site_key]
+            scraper = SiteScraper(site_key, site_cfg, session=session, cache=cache)
+            for cat_key, cat_cfg in site_cfg["categories"].items():
+                if categories_filter and cat_key not in categories_filter:
+                    continue
+                fut = ex.submit(scraper.scrape_category, cat_key, cat_cfg, args.limit_per_category)
+                futures[fut] = (site_key, cat_key)
+        for fut in as_completed(futures):
+            site_key, cat_key = futures[fut]
+            print(f"[info] {site_key}/{cat_key}: {len(fut.result())} items")
+    for fut in futures:
+        all_items.extend(fut.result())
 
     # dedup
     dedup = {}
@@ -321,8 +637,9 @@ def run_scrape(args) -> List[MaterialItem]:
 
 def write_output(items: List[MaterialItem], out_path: str):
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(to_serializable(items), f, ensure_ascii=False, indent=2)
+    # orjson serializes the dataclasses natively, no intermediate dicts
+    with open(out_path, "wb") as f:
+        f.write(orjson.dumps(items, option=orjson.OPT_INDENT_2))
 
 def maybe_start_server(args, items: List[MaterialItem]):
     if not args.serve:
@@ -331,13 +648,13 @@ def maybe_start_server(args, items: List[MaterialItem]):
     import uvicorn
 
     app = FastAPI(title="Donizo Materials API (Sim)")
-    data = to_serializable(items)
 
-    @app.get("/materials/{category}")
+    # serve the dataclasses as-is; FastAPI serializes them per response
+    @app.get("/materials/{category}", response_model=List[MaterialItem])
     def get_by_category(category: str, site: Optional[str] = None, limit: int = 100):
-        rows = [r for r in data if r["category"].lower() == category.lower()]
+        rows = [i for i in items if i.category.lower() == category.lower()]
         if site:
-            rows = [r for r in rows if r["site"].lower() == site.lower()]
+            rows = [i for i in rows if i.site.lower() == site.lower()]
         if not rows:
             raise HTTPException(status_code=404, detail="No data for given filters")
         return rows[:limit]
@@ -351,6 +668,12 @@ def main():
     p.add_argument("--site", default="all", help="all | leroymerlin | castorama | manomano")
     p.add_argument("--categories", default="", help="Comma-separated, e.g., tiles,sinks,paint")
     p.add_argument("--limit-per-category", type=int, default=200)
+    p.add_argument("--http2", action="store_true", help="Fetch with httpx over HTTP/2 instead of requests")
+    p.add_argument("--http-cache", default="data/http_cache.sqlite",
+                   help="sqlite file for conditional GETs (ETag/Last-Modified); empty to disable")
+    p.add_argument("--cache-ttl", type=float, default=0,
+                   help="Seconds a cached page is reused without revalidating")
+    p.add_argument("--workers", type=int, default=8, help="Categories scraped in parallel")
     p.add_argument("--out", default="data/materials.json")
     p.add_argument("--serve", action="store_true")
     args = p.parse_args()
@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+# project root on the import path for the shared index settings
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from tfidf_index import INDEX_DIR, INDEX_FORMAT, make_vectorizer
+
+IN = Path("data/materials.json")
+
+def build_text(r: dict) -> str:
+    price_raw = (r.get("price") or {}).get("raw") or ""
+    brand = r.get("brand") or ""
+    unit = r.get("unit") or ""
+    parts = [
+        r.get("site",""),
+        r.get("category",""),
+        brand,
+        r.get("name",""),
+        price_raw,
+        unit,
+        r.get("url","")
+    ]
+    return " | ".join([p for p in parts if p])
+
+def save_index(vectorizer, matrix, out_dir: Path = INDEX_DIR):
+    # CSR arrays go to plain .npy files so api.py can np.load(..., mmap_mode="r")
+    # them and share the pages across uvicorn/gunicorn workers
+    out_dir.mkdir(parents=True, exist_ok=True)
+    matrix = matrix.tocsr().astype(np.float32, copy=False)
+    np.save(out_dir / "data.npy", matrix.data)
+    np.save(out_dir / "indices.npy", matrix.indices)
+    np.save(out_dir / "indptr.npy", matrix.indptr)
+    # vectorizer last: api.py uses its mtime to decide whether the index is fresh
+    joblib.dump({"format": INDEX_FORMAT, "vectorizer": vectorizer, "shape": matrix.shape},
+                out_dir / "vectorizer.joblib")
+
+def main():
+    if not IN.exists():
+        raise SystemExit(f"Input not found: {IN}. Run scraper first.")
+    rows = json.load(open(IN, "r", encoding="utf-8"))
+    vectorizer = make_vectorizer()
+    matrix = vectorizer.fit_transform([build_text(r) for r in rows])
+    save_index(vectorizer, matrix)
+    print(f"Wrote {INDEX_DIR} ({matrix.shape[0]} rows x {matrix.shape[1]} features)")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
-import json
 import os
 from pathlib import Path
 
+import orjson
+
 IN = Path("data/materials.json")
 OUT = Path("data/materials.jsonl")
 OUT.parent.mkdir(parents=True, exist_ok=True)
+# inputs bigger than this are streamed with ijson (if installed) instead of loaded whole
+STREAM_THRESHOLD = 64 * 1024 * 1024
 
 def build_text(r: dict) -> str:
     price_raw = (r.get("price") or {}).get("raw") or ""
@@ -21,12 +24,25 @@ def build_text(r: dict) -> str:
     ]
     return " | ".join([p for p in parts if p])
 
+def iter_rows(path: Path):
+    if path.stat().st_size > STREAM_THRESHOLD:
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+        if ijson is not None:
+            with open(path, "rb") as f:
+                yield from ijson.items(f, "item", use_float=True)
+            return
+    with open(path, "rb") as f:
+        yield from orjson.loads(f.read())
+
 def main():
     if not IN.exists():
         raise SystemExit(f"Input not found: {IN}. Run scraper first.")
-    rows = json.load(open(IN, "r", encoding="utf-8"))
-    with open(OUT, "w", encoding="utf-8") as out:
-        for r in rows:
+    n = 0
+    with open(OUT, "wb") as out:
+        for r in iter_rows(IN):
             rec = {
                 "id": r["id"],
                 "text": build_text(r),
@@ -39,8 +55,10 @@ def main():
                     "url": r.get("url"),
                 }
             }
-            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
-    print(f"Wrote {OUT} ({sum(1 for _ in open(OUT,'r',encoding='utf-8'))} lines)")
+            out.write(orjson.dumps(rec))
+            out.write(b"\n")
+            n += 1
+    print(f"Wrote {OUT} ({n} lines)")
 
 if __name__ == "__main__":
     main()
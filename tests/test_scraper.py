@@ -1,12 +1,18 @@
+import dataclasses
 import pytest
+import requests
 from bs4 import BeautifulSoup
-from scraper import parse_price_unit, SiteScraper, MaterialItem, make_session
+from scraper import parse_price_unit, response_body, SiteScraper, MaterialItem, HttpCache, make_session
 
 def test_parse_price_unit_variants():
     v, c, u, raw = parse_price_unit("19,90 € / m²")
     assert c == "€" and abs(v - 19.90) < 0.01 and u in ("m²", "m2")
     v, c, u, raw = parse_price_unit("Prix: 8.99€ / M2")
     assert c == "€" and abs(v - 8.99) < 0.01 and u.lower() in ("m²", "m2")
+    v, c, u, raw = parse_price_unit("EUR\xa012,50 par kg")
+    assert c == "€" and abs(v - 12.50) < 0.01 and u == "kg" and raw == "EUR 12,50 par kg"
+    v, c, u, raw = parse_price_unit("/m² 12,50 €")
+    assert c == "€" and abs(v - 12.50) < 0.01 and u == "m²"
 
 def test_parse_card_anchor_minimal():
     html = '''
@@ -40,3 +46,126 @@ def test_parse_card_anchor_minimal():
     assert item.brand == "Ecoceramic"
     assert item.price.currency == "€"
     assert item.url.startswith("https://")
+
+def test_parse_card_skips_repeat_url():
+    html = '<div><a href="/p/D1_CAFR.prd">Carrelage 60x60 19,95 €</a></div>'
+    card = BeautifulSoup(html, "lxml").select_one("a")
+    site_cfg = {"selectors": {"product_card": "a", "name": "h2"}, "throttle_seconds": 0}
+    sc = SiteScraper("castorama", site_cfg, session=make_session())
+    assert sc.parse_card("https://www.castorama.fr/", card, "tiles") is not None
+    assert sc.parse_card("https://www.castorama.fr/?page=2", card, "tiles") is None
+    assert sc.parse_card("https://www.castorama.fr/", card, "paint") is not None
+
+def test_parse_card_image_link_does_not_hide_title_link():
+    html = ('<div><a href="/p/X_CAFR.prd"><img src="/i/x.jpg"/></a>'
+            '<a href="/p/X_CAFR.prd">Carrelage X</a><span class="price">19,95 €</span></div>')
+    site_cfg = {"selectors": {"product_card": "a[href$='_CAFR.prd']", "name": "h2", "price": ".price"},
+                "throttle_seconds": 0}
+    docs = [BeautifulSoup(html, "lxml")]
+    lexbor = pytest.importorskip("selectolax.lexbor")
+    docs.append(lexbor.LexborHTMLParser(html))
+    for doc in docs:
+        sc = SiteScraper("castorama", site_cfg, session=make_session())
+        items = [sc.parse_card("https://www.castorama.fr/", c, "tiles") for c in sc.select("product_card", doc)]
+        assert [i and i.name for i in items] == [None, "Carrelage X"]
+
+def test_parse_card_fast_parser_matches_bs4():
+    lexbor = pytest.importorskip("selectolax.lexbor")
+    html = '''
+    <ul><li>
+      <a href="/p/D2_CAFR.prd">Evier inox 1 bac</a>
+      <span class="brand">Cooke</span>
+      <span class="price">89,00 € / pièce</span>
+      <img data-src="/i/d2.jpg"/>
+    </li></ul>
+    '''
+    site_cfg = {
+        "selectors": {"product_card": "a[href$='_CAFR.prd']", "name": "h2", "brand": ".brand",
+                      "price": ".price", "image": "img", "availability": ".stock"},
+        "throttle_seconds": 0,
+    }
+    items = []
+    for doc in (BeautifulSoup(html, "lxml"), lexbor.LexborHTMLParser(html)):
+        sc = SiteScraper("castorama", site_cfg, session=make_session())
+        card = sc.select("product_card", doc)[0]
+        items.append(sc.parse_card("https://www.castorama.fr/", card, "sinks"))
+    bs4_item, fast_item = items
+    # a container carrying a field's class must not match itself on either parser
+    for doc in (BeautifulSoup('<div class="card"><p>x</p></div>', "lxml"),
+                lexbor.LexborHTMLParser('<div class="card"><p>x</p></div>')):
+        sc = SiteScraper("castorama", {"selectors": {"name": "div.card"}}, session=make_session())
+        container = doc.select_one("div.card") if hasattr(doc, "select_one") else doc.css_first("div.card")
+        assert sc.select_one("name", container) is None
+    assert fast_item.name == "Evier inox 1 bac" and fast_item.unit == "pièce"
+    assert dataclasses.replace(fast_item, scraped_at="") == dataclasses.replace(bs4_item, scraped_at="")
+
+def test_scrape_category_stops_after_empty_page():
+    pages = {
+        1: '<li><a href="/p/A_CAFR.prd">Carrelage A</a><span class="price">10 €</span></li>',
+        2: '<li><a href="/p/B_CAFR.prd">Carrelage B</a><span class="price">12 €</span></li>',
+        3: '<li><a href="/p/B_CAFR.prd">Carrelage B</a><span class="price">12 €</span></li>',
+    }
+    fetched = []
+
+    class FakeScraper(SiteScraper):
+        def _fetch_html(self, url, render_fallback=True):
+            fetched.append(url)
+            return pages.get(int(url.rsplit("=", 1)[1]), "<html></html>")
+
+    site_cfg = {
+        "selectors": {"product_card": "a[href$='_CAFR.prd']", "name": "h2", "price": ".price"},
+        "pagination": {"param": "page", "start_page": 1, "max_pages": 10},
+        "throttle_seconds": 0,
+    }
+    sc = FakeScraper("castorama", site_cfg, session=make_session())
+    items = sc.scrape_category("tiles", {"url": "https://www.castorama.fr/c"}, limit=100)
+    assert [i.name for i in items] == ["Carrelage A", "Carrelage B"]
+    # page 3 only repeats page 2, so pages 4..10 are never requested
+    assert len(fetched) == 3
+
+def test_fetch_html_revalidates_with_etag(tmp_path):
+    class Resp:
+        def __init__(self, status, content=b"", headers=None):
+            self.status_code, self.content, self.headers = status, content, headers or {}
+
+    class Session:
+        def __init__(self):
+            self.sent = []
+        def get(self, url, timeout=None, headers=None):
+            self.sent.append(headers)
+            if headers and headers.get("If-None-Match") == '"v1"':
+                return Resp(304)
+            return Resp(200, b"<html>listing</html>", {"ETag": '"v1"', "Content-Type": "text/html; charset=utf-8"})
+
+    session = Session()
+    cache = HttpCache(str(tmp_path / "http_cache.sqlite"))
+    sc = SiteScraper("castorama", {"selectors": {}, "throttle_seconds": 0}, session=session, cache=cache)
+    assert sc._fetch_html("https://www.castorama.fr/c") == b"<html>listing</html>"
+    assert sc._fetch_html("https://www.castorama.fr/c") == "<html>listing</html>"
+    assert session.sent == [{}, {"If-None-Match": '"v1"'}]
+    # no validator and ttl 0: nothing worth storing
+    session.get = lambda url, timeout=None, headers=None: Resp(200, b"<html>x</html>")
+    sc._fetch_html("https://www.castorama.fr/other")
+    assert cache.get("https://www.castorama.fr/other") is None
+
+def test_session_rotates_user_agent_per_request(monkeypatch):
+    from requests.adapters import HTTPAdapter
+    sent = []
+    monkeypatch.setattr(HTTPAdapter, "send", lambda self, request, **kw: sent.append(request.headers["User-Agent"]))
+    s = make_session()
+    adapter = s.get_adapter("https://www.castorama.fr/")
+    for _ in range(2):
+        adapter.send(s.prepare_request(requests.Request("GET", "https://www.castorama.fr/")))
+    assert len(set(sent)) == 2 and "Accept-Language" in s.headers
+
+def test_response_body_bytes_only_when_safe():
+    class Resp:
+        def __init__(self, ctype):
+            self.headers = {"Content-Type": ctype}
+            self.text = '<meta charset="iso-8859-1"><p>Évier</p>'
+            self.content = self.text.encode("latin-1")
+    # no header charset: lexbor would misread <meta charset> pages as UTF-8
+    assert response_body(Resp("text/html"), fast=True).endswith("<p>Évier</p>")
+    assert isinstance(response_body(Resp("text/html"), fast=False), bytes)
+    assert isinstance(response_body(Resp("text/html; charset=UTF-8"), fast=True), bytes)
+    assert response_body(Resp("text/html; charset=iso-8859-1"), fast=False).endswith("<p>Évier</p>")
@@ -0,0 +1,22 @@
+"""
+Shared TF-IDF index settings for api.py and scripts/build_index.py
+(api.py can't be imported by the script: importing it loads the data and fits the index)
+"""
+
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline, make_pipeline
+
+INDEX_DIR = Path("data/tfidf")
+# bump when make_vectorizer changes; api.py refits indexes written with another format
+INDEX_FORMAT = 2
+
+def make_vectorizer() -> Pipeline:
+    # hashed (1,2)-grams keep the fitted state to one IDF vector, no vocabulary dict;
+    # float32 end to end halves the bytes the sparse dot product in search() streams
+    return make_pipeline(
+        HashingVectorizer(n_features=2**18, alternate_sign=False, ngram_range=(1,2), norm=None, dtype=np.float32),
+        TfidfTransformer(sublinear_tf=True),
+    )